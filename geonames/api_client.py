@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+This file requests the urls constructed by APIUrl, reusing the connections to the geonames servers.
+"""
+
+from inspect import signature
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from geonames.api_url import APIUrl, _END_POINT_METHODS
+
+__author__ = "Dawud Hage"
+__copyright__ = "Copyright 2017"
+__credits__ = ["Dawud Hage"]
+__license__ = "MIT"
+__version__ = "0"
+__maintainer__ = "Dawud Hage"
+__email__ = "me@dawudhage.com"
+__status__ = "Prototype"
+
+
+class APIClient(object):
+    def __init__(self, api, pool=10, timeout=None):
+        """
+        Every endpoint method of APIUrl is available on the client with the same arguments, but returns the response
+        of the api instead of the url. All requests share one requests.Session, so the TCP and TLS connections are
+        kept alive and reused instead of being set up again for every request.
+
+        :param api: The url builder, holds the username, secure and default_output_format settings
+        :type api: APIUrl
+        :param pool: The maximum number of connections that are kept alive per host
+        :type pool: int
+        :param timeout: The timeout of a request in seconds, default is no timeout
+        :type timeout: float
+        """
+
+        if not isinstance(api, APIUrl):
+            raise TypeError("parameter api must be of type APIUrl")
+
+        self._api = api
+        self._timeout = timeout
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def get(self, url):
+        """
+        Request an url over the shared session
+        :param url: The url, as constructed by APIUrl
+        :type url: str
+
+        :return: The parsed JSON response, or the text for the other output formats
+        :rtype: dict or str
+        """
+        response = self._session.get(url, timeout=self._timeout)
+        response.raise_for_status()
+        if "json" in response.headers.get("Content-Type", ""):
+            return response.json()
+        return response.text
+
+    def close(self):
+        """
+        Close the connections of the shared session
+        """
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _add_end_point_method(name):
+    """
+    Add a method to APIClient that requests the url constructed by the APIUrl method with the same name.
+    :param name: The name of the APIUrl method
+    :type name: str
+    """
+    build_url = getattr(APIUrl, name)
+
+    def end_point_method(self, *args, **kwargs):
+        return self.get(build_url(self._api, *args, **kwargs))
+
+    # Only the name and the arguments are taken over, the docstring of APIUrl describes the url as return value
+    end_point_method.__name__ = name
+    end_point_method.__qualname__ = f"APIClient.{name}"
+    end_point_method.__signature__ = signature(build_url)
+    end_point_method.__doc__ = f"""
+        Request the url constructed by APIUrl.{name}, see there for the parameters.
+
+        :return: The parsed JSON response, or the text for the other output formats
+        :rtype: dict or str
+        """
+
+    setattr(APIClient, name, end_point_method)
+
+
+for _name in _END_POINT_METHODS:
+    _add_end_point_method(_name)
+
+
+if __name__ == "__main__":
+    with APIClient(APIUrl('demo')) as c:
+        print(c.timezone(51.2277, 6.7735))
+        print(c.country_info(['NL', 'DE']))
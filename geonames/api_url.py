@@ -3,8 +3,10 @@
 This file collects all the different api endpoints and constructs the urls.
 """
 
-from urllib.parse import urlencode
+from urllib.parse import quote_plus
 from datetime import date
+from functools import lru_cache
+import re
 
 __author__ = "Dawud Hage"
 __copyright__ = "Copyright 2017"
@@ -15,8 +17,180 @@ __maintainer__ = "Dawud Hage"
 __email__ = "me@dawudhage.com"
 __status__ = "Prototype"
 
+# The methods of APIUrl that construct the url of a single request
+_END_POINT_METHODS = (
+    "search",
+    "cities_and_place_names_bounding_box",
+    "children",
+    "neighbours",
+    "hierarchy",
+    "siblings",
+    "postal_code_to_place_name",
+    "wikipedia_find_nearby",
+    "wikipedia_fulltext_search",
+    "wikipedia_bounding_box",
+    "earthquakes_bounding_box",
+    "weather_station_bounding_box",
+    "weather_station_icao",
+    "weather_station_find_nearby",
+    "country_info",
+    "ocean",
+    "timezone",
+)
+
+# Characters that quote_plus never escapes
+_UNSAFE_CHARACTERS = re.compile(r"[^A-Za-z0-9_.\-~]")
+
+
+def _quote(text):
+    """
+    Quote a key or value for the query string, identical to quote_plus. Most keys and values (numbers, codes)
+    contain nothing that needs escaping, those are returned as is without going through quote_plus.
+    :param text: The text to quote
+    :type text: str
+
+    :return: The quoted text
+    :rtype: str
+    """
+    if _UNSAFE_CHARACTERS.search(text) is None:
+        return text
+    return quote_plus(text)
+
+
+def _quote_number(value):
+    """
+    Quote a numeric value (coordinates, radius, maxRows) for the query string, identical to _quote(str(value)).
+    Integers and floats below 1e16 (no exponent with a '+') never need escaping, so they skip the check entirely.
+    The value is not rounded or reformatted, it is written as str(value).
+    :param value: The value to quote
+    :type value: int or float or str
+
+    :return: The quoted value
+    :rtype: str
+    """
+    value_type = type(value)
+    if value_type is int or (value_type is float and -1e16 < value < 1e16):
+        return str(value)
+    return _quote(str(value))
+
+
+@lru_cache(maxsize=1024)
+def _encode_query(keys):
+    """
+    Encode the key-value pairs into a query string. The result is cached, since clients tend to request the same
+    urls over and over again (paging, polling).
+    :param keys: The key-value pairs, list values are stored as tuples to keep them hashable
+    :type keys: tuple of 2 element-tuples
+
+    :return: The query string
+    :rtype: str
+    """
+    parts = []
+    for key, value in keys:
+        key = _quote(key)
+        if isinstance(value, tuple):
+            # A list value results in a repeated key, like urlencode(doseq=True)
+            parts.extend(key + "=" + _quote(v) for v in value)
+        else:
+            parts.append(key + "=" + _quote(value))
+    return "&".join(parts)
+
+
+@lru_cache(maxsize=32)
+def _date_str(date_to_convert):
+    """
+    Convert a date into the "YYYY-MM-DD" format of the api. The result is cached, since the same date is typically
+    reused for many requests.
+    :param date_to_convert: The date to convert
+    :type date_to_convert: datetime.date or str "YYYY-MM-DD"
+
+    :return: The formatted date
+    :rtype: str
+    """
+    if isinstance(date_to_convert, date):
+        # date.isoformat is called on the class, so a datetime.datetime is formatted without its time as well
+        return date.isoformat(date_to_convert)
+    # Anything else (e.g. 20170707) is written as is, like any other parameter
+    return str(date_to_convert)
+
+
+def _freeze(value):
+    """
+    Convert a query value into a hashable value with the same string representation as used in the query string.
+    This also makes sure that e.g. 1 and 1.0 do not share a cache entry. An iterable (list, tuple, set, generator)
+    is expanded into a repeated key, bytes and dicts are single values like any other value.
+    :param value: The value belonging to a key
+    :type value: object
+
+    :return: The hashable value
+    :rtype: str or tuple
+    """
+    if hasattr(value, "__iter__") and not isinstance(value, (str, bytes, bytearray, dict)):
+        # The elements are expanded into a repeated key, map keeps the conversion out of a Python-level loop
+        return tuple(map(str, value))
+    return str(value)
+
+
+def _freeze_keys(keys):
+    """
+    Drop the key-value pairs with a None value and make the remaining pairs hashable, see _freeze.
+    :param keys: The key-value pairs that will be used to construct the API url
+    :type keys: iterable of 2 element-tuples
+
+    :return: The hashable key-value pairs
+    :rtype: tuple of 2 element-tuples
+    """
+    return tuple((key, value if isinstance(value, str) else _freeze(value)) for key, value in keys if value is not None)
+
+
+def _build_url(api, method, arguments):
+    """
+    Construct a single url, used by the worker processes of APIUrl.build_urls_parallel.
+    :param api: The APIUrl instance
+    :type api: APIUrl
+    :param method: The name of the endpoint method
+    :type method: str
+    :param arguments: A dict with keyword arguments or a tuple with positional arguments for the method
+    :type arguments: dict or tuple
+
+    :return: The corresponding url
+    :rtype: str
+    """
+    if isinstance(arguments, dict):
+        return getattr(api, method)(**arguments)
+    return getattr(api, method)(*arguments)
+
 
 class APIUrl(object):
+    # A fixed set of attributes, no per-instance __dict__, instances can still be weakly referenced
+    __slots__ = ('_username', 'default_output_format', '_secure', '_base_urls', '_search_urls', '_end_points',
+                 '_username_encoded', '__weakref__')
+
+    # Depending if a secure connection is desired the base url changes
+    _BASE_SECURE = "https://secure.geonames.org/"
+    _BASE_INSECURE = "http://api.geonames.org/"
+    # The search endpoint does not take the output format in its name, so its url is fixed per base url
+    _EP_SEARCH = "search"
+    # The other endpoints, with the output formats they accept on top of 'JSON' and 'XML'
+    _END_POINTS = {
+        "cities": frozenset(),
+        "children": frozenset(),
+        "neighbours": frozenset(),
+        "hierarchy": frozenset(),
+        "siblings": frozenset(),
+        "postalCodeLookup": frozenset(),
+        "findNearbyWikipedia": frozenset(),
+        "wikipediaSearch": frozenset(),
+        "wikipediaBoundingBox": frozenset(),
+        "earthquakes": frozenset(),
+        "weather": frozenset(),
+        "weatherIcao": frozenset(),
+        "findNearByWeather": frozenset(),
+        "countryInfo": frozenset({"CSV"}),
+        "ocean": frozenset(),
+        "timezone": frozenset(),
+    }
+
     def __init__(self, username, secure=True, default_output_format="JSON"):
         """
         
@@ -28,13 +202,44 @@ class APIUrl(object):
         :type default_output_format: str
         """
 
-        assert isinstance(username, str), "parameter username must be of type str"
-        assert isinstance(secure, bool), "parameter secure must be of type bool"
-        assert default_output_format in ["JSON", "XML"], "default_output_format can only be 'JSON' or 'XML'."
+        if not isinstance(secure, bool):
+            raise TypeError("parameter secure must be of type bool")
+        if default_output_format != "JSON" and default_output_format != "XML":
+            raise ValueError("default_output_format can only be 'JSON' or 'XML'.")
 
-        self.username = username
-        self._base_url = self._create_base_url(secure)
+        self._secure = secure
+        # Both base urls are built once, indexed by the secure flag
+        self._base_urls = (self._BASE_INSECURE, self._BASE_SECURE)
         self.default_output_format = default_output_format
+        # Builds the endpoint urls, which include the username
+        self.username = username
+
+    @property
+    def username(self):
+        """
+        The registered username at geonames.org, setting it rebuilds the endpoint urls.
+        :rtype: str
+        """
+        return self._username
+
+    @username.setter
+    def username(self, username):
+        if not isinstance(username, str):
+            raise TypeError("parameter username must be of type str")
+
+        self._username = username
+        # The username is the same for every url, so it is quoted only once
+        self._username_encoded = quote_plus(username)
+        self._search_urls = tuple(base_url + self._EP_SEARCH + "?username=" + self._username_encoded
+                                  for base_url in self._base_urls)
+        # The endpoint urls including the username, for every combination of secure and output format
+        self._end_points = {
+            (end_point, secure_flag, end_point_format):
+                self._build_end_point(secure_flag, end_point, end_point_format)
+            for end_point, additional_output_formats in self._END_POINTS.items()
+            for secure_flag in (False, True)
+            for end_point_format in ("JSON", "XML", *additional_output_formats)
+        }
 
     def search(self, q=None, name=None, name_equals=None, name_starts_with=None, max_rows=None, start_row=None,
                country=None, country_bias=None, continent_code=None, admin_code1=None, admin_code2=None,
@@ -123,65 +328,44 @@ class APIUrl(object):
         :rtype: str
         """
 
-        # Check if the required parameters are given
-        assert any((q, name, name_equals)), "q, name or name_equals required"
-
-        if secure:
-            base_url = self._create_base_url(secure)
-        else:
-            base_url = self._base_url
+        if output_format is None:
+            output_format = self.default_output_format
 
         # Add the search endpoint:
-        url = base_url + "search?"
-        keys = [("username", self.username)]
-
-        self._add_key_value(keys, key='q', value=q)
-        self._add_key_value(keys, key='name', value=name)
-        self._add_key_value(keys, key='name_equals', value=name_equals)
-        self._add_key_value(keys, key='name_startsWith', value=name_starts_with)
-        self._add_key_value(keys, key='maxRows', value=max_rows)
-        self._add_key_value(keys, key='startRow', value=start_row)
-        if country is not None:
-            if isinstance(country, str):
-                country = [country]
-            for c in country:
-                self._add_key_value(keys, key='country', value=c)
-        self._add_key_value(keys, key='countryBias', value=country_bias)
-        self._add_key_value(keys, key='continentCode', value=continent_code)
-        self._add_key_value(keys, key='adminCode1', value=admin_code1)
-        self._add_key_value(keys, key='adminCode2', value=admin_code2)
-        self._add_key_value(keys, key='adminCode3', value=admin_code3)
-        if feature_class is not None:
-            if isinstance(feature_class, str):
-                feature_class = [feature_class]
-            for f in feature_class:
-                self._add_key_value(keys, key='featureClass', value=f)
-        if feature_code is not None:
-            if isinstance(feature_code, str):
-                feature_code = [feature_code]
-            for f in feature_code:
-                self._add_key_value(keys, key='featureCode', value=f)
-        self._add_key_value(keys, key='cities', value=cities)
-        self._add_key_value(keys, key='lang', value=language)
-        self._add_key_value(keys, key='style', value=style)
-        self._add_key_value(keys, key='isNameRequired', value=is_name_required)
-        self._add_key_value(keys, key='tag', value=tag)
-        self._add_key_value(keys, key='operator', value=operator)
-        self._add_key_value(keys, key='charset', value=charset)
-        self._add_key_value(keys, key='fuzzy', value=fuzzy)
-        if None not in (north, east, south, west):
-            self._add_key_value(keys, key='north', value=north)
-            self._add_key_value(keys, key='east', value=east)
-            self._add_key_value(keys, key='south', value=south)
-            self._add_key_value(keys, key='west', value=west)
-        self._add_key_value(keys, key='searchlang', value=search_language)
-        self._add_key_value(keys, key='orderby', value=order_by)
-        self._add_key_value(keys, key='inclBbox', value=include_bbox)
+        return self._finalize(self._search_urls[self._secure if secure is None else secure], self._search_keys(
+            q, name, name_equals, name_starts_with, max_rows, start_row, country, country_bias, continent_code,
+            admin_code1, admin_code2, admin_code3, feature_class, feature_code, cities, language, style,
+            is_name_required, tag, operator, charset, fuzzy, north, east, south, west, search_language, order_by,
+            include_bbox) + (('type', output_format),))
+
+    def search_many(self, queries, secure=None, output_format=None):
+        """
+        Construct the full-text search urls for a batch of queries, see search. The part of the url that is shared by
+        all queries (endpoint, username and type) is encoded only once.
+        :param queries: The search queries, each a dict with the keyword arguments of search (without secure and
+         output_format), e.g. {'q': 'Berlin', 'country': ['DE', 'NL'], 'max_rows': 10}.
+        :type queries: iterable of dict
+
+        :param secure: Overwrite the class parameter secure, True for using the secure endpoint
+        :type secure: bool
+        :param output_format: Overwrite the class parameter default_output_format, 'JSON', 'XML', 'RDF'
+        :type output_format: str
+
+        :return: The corresponding urls
+        :rtype: list of str
+        """
+
         if output_format is None:
             output_format = self.default_output_format
-        self._add_key_value(keys, key='type', value=output_format)
 
-        return url + urlencode(keys, encoding="utf-8")
+        prefix = self._search_urls[self._secure if secure is None else secure] + "&"
+        suffix = "&type=" + _quote(output_format)
+
+        urls = []
+        for query in queries:
+            urls.append(prefix + _encode_query(_freeze_keys(self._search_keys(**query))) + suffix)
+
+        return urls
 
     # # Places
     def cities_and_place_names_bounding_box(self, north, east, south, west, language=None,
@@ -213,22 +397,21 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "cities", output_format)
+        url = self._create_bare_end_point(secure, "cities", output_format)
 
-        # assert the required parameters
-        assert None not in (north, east, south, west), "north, east, south and west are required parameters."
+        # check the required parameters
+        if north is None or east is None or south is None or west is None:
+            raise ValueError("north, east, south and west are required parameters.")
 
-        # Add the required parameters
-        self._add_key_value(keys, key='north', value=north)
-        self._add_key_value(keys, key='east', value=east)
-        self._add_key_value(keys, key='south', value=south)
-        self._add_key_value(keys, key='west', value=west)
+        parts = [f"{url}&north={_quote_number(north)}&east={_quote_number(east)}"
+                 f"&south={_quote_number(south)}&west={_quote_number(west)}"]
+        append = parts.append
+        if language is not None:
+            append(f"&lang={_quote(str(language))}")
+        if max_rows is not None:
+            append(f"&maxRows={_quote_number(max_rows)}")
 
-        # Add the optional parameter:
-        self._add_key_value(keys, key='lang', value=language)
-        self._add_key_value(keys, key='maxRows', value=max_rows)
-
-        return url + urlencode(keys, encoding="utf-8")
+        return "".join(parts)
 
     # # Place Hierarchy
     def children(self, geoname_id, hierarchy=None, max_rows=None, secure=None, output_format=None):
@@ -257,15 +440,19 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "children", output_format)
+        url = self._create_bare_end_point(secure, "children", output_format)
 
-        assert geoname_id, "geoname_id is a required parameter."
+        if not geoname_id:
+            raise ValueError("geoname_id is a required parameter.")
 
-        self._add_key_value(keys, key='geonameId', value=geoname_id)
-        self._add_key_value(keys, key='hierarchy', value=hierarchy)
-        self._add_key_value(keys, key='maxRows', value=max_rows)
+        parts = [f"{url}&geonameId={int(geoname_id)}"]
+        append = parts.append
+        if hierarchy is not None:
+            append(f"&hierarchy={_quote(str(hierarchy))}")
+        if max_rows is not None:
+            append(f"&maxRows={_quote_number(max_rows)}")
 
-        return url + urlencode(keys, encoding="utf-8")
+        return "".join(parts)
 
     def neighbours(self, geoname_id=None, country=None, secure=None, output_format=None):
         """
@@ -289,15 +476,14 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "neighbours", output_format)
-
-        assert any((geoname_id, country)) and not all((geoname_id, country)), \
-            "geoname_id or country is a required parameter."
+        url = self._create_bare_end_point(secure, "neighbours", output_format)
 
-        self._add_key_value(keys, key='geonameId', value=geoname_id)
-        self._add_key_value(keys, key='country', value=country)
+        if (not geoname_id) == (not country):
+            raise ValueError("geoname_id or country is a required parameter.")
 
-        return url + urlencode(keys, encoding="utf-8")
+        if geoname_id:
+            return f"{url}&geonameId={int(geoname_id)}"
+        return f"{url}&country={_quote(str(country))}"
 
     def hierarchy(self, geoname_id, secure=None, output_format=None):
         """
@@ -318,13 +504,12 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "hierarchy", output_format)
+        url = self._create_bare_end_point(secure, "hierarchy", output_format)
 
-        assert geoname_id, "geoname_id is a required parameter."
+        if not geoname_id:
+            raise ValueError("geoname_id is a required parameter.")
 
-        self._add_key_value(keys, key='geonameId', value=geoname_id)
-
-        return url + urlencode(keys, encoding="utf-8")
+        return f"{url}&geonameId={int(geoname_id)}"
 
     def siblings(self, geoname_id, secure=None, output_format=None):
         """
@@ -345,13 +530,12 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "siblings", output_format)
-
-        assert geoname_id, "geoname_id is a required parameter."
+        url = self._create_bare_end_point(secure, "siblings", output_format)
 
-        self._add_key_value(keys, key='geonameId', value=geoname_id)
+        if not geoname_id:
+            raise ValueError("geoname_id is a required parameter.")
 
-        return url + urlencode(keys, encoding="utf-8")
+        return f"{url}&geonameId={int(geoname_id)}"
 
     # # Postal codes
     def postal_code_to_place_name(self, postal_code, country=None, charset=None, max_rows=None, secure=None,
@@ -378,16 +562,21 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "postalCodeLookup", output_format)
+        url = self._create_bare_end_point(secure, "postalCodeLookup", output_format)
 
-        assert postal_code, "postal_code is a required parameter."
+        if not postal_code:
+            raise ValueError("postal_code is a required parameter.")
 
-        self._add_key_value(keys, key='postalcode', value=postal_code)
-        self._add_key_value(keys, key='country', value=country)
-        self._add_key_value(keys, key='charset', value=charset)
-        self._add_key_value(keys, key='maxRows', value=max_rows)
+        parts = [f"{url}&postalcode={_quote(str(postal_code))}"]
+        append = parts.append
+        if country is not None:
+            append(f"&country={_quote(str(country))}")
+        if charset is not None:
+            append(f"&charset={_quote(str(charset))}")
+        if max_rows is not None:
+            append(f"&maxRows={_quote_number(max_rows)}")
 
-        return url + urlencode(keys, encoding="utf-8")
+        return "".join(parts)
 
     def wikipedia_find_nearby(self, latitude=None, longitude=None, postal_code=None, radius=None, language=None,
                               max_rows=None, country=None, secure=None, output_format=None):
@@ -419,26 +608,33 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "findNearbyWikipedia", output_format)
+        url = self._create_bare_end_point(secure, "findNearbyWikipedia", output_format)
 
-        # assert the required parameters
+        # check the required parameters
         if postal_code is None:
-            assert latitude is not None and longitude is not None, \
-                "Either (latitude + longitude) OR postal_code should be provided."
-        else:
-            assert (latitude is None or longitude is None), \
-                "Only (latitude + longitude) OR postal_code should be provided."
-
-        # Add the optional parameter:
-        self._add_key_value(keys, key='lat', value=latitude)
-        self._add_key_value(keys, key='lng', value=longitude)
-        self._add_key_value(keys, key='postalcode', value=postal_code)
-        self._add_key_value(keys, key='radius', value=radius)
-        self._add_key_value(keys, key='lang', value=language)
-        self._add_key_value(keys, key='maxRows', value=max_rows)
-        self._add_key_value(keys, key='country', value=country)
+            if latitude is None or longitude is None:
+                raise ValueError("Either (latitude + longitude) OR postal_code should be provided.")
+        elif latitude is not None and longitude is not None:
+            raise ValueError("Only (latitude + longitude) OR postal_code should be provided.")
+
+        parts = [url]
+        append = parts.append
+        if latitude is not None:
+            append(f"&lat={_quote_number(latitude)}")
+        if longitude is not None:
+            append(f"&lng={_quote_number(longitude)}")
+        if postal_code is not None:
+            append(f"&postalcode={_quote(str(postal_code))}")
+        if radius is not None:
+            append(f"&radius={_quote_number(radius)}")
+        if language is not None:
+            append(f"&lang={_quote(str(language))}")
+        if max_rows is not None:
+            append(f"&maxRows={_quote_number(max_rows)}")
+        if country is not None:
+            append(f"&country={_quote(str(country))}")
 
-        return url + urlencode(keys, encoding="utf-8")
+        return "".join(parts)
 
     def wikipedia_fulltext_search(self, q, title=None, language=None, max_rows=None, secure=None, output_format=None):
         """
@@ -463,20 +659,22 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "wikipediaSearch", output_format)
+        url = self._create_bare_end_point(secure, "wikipediaSearch", output_format)
 
-        # assert the required parameters
-        assert q, "q is a required parameter."
+        # check the required parameters
+        if not q:
+            raise ValueError("q is a required parameter.")
 
-        # Add the required parameters
-        self._add_key_value(keys, key='q', value=q)
+        parts = [f"{url}&q={_quote(str(q))}"]
+        append = parts.append
+        if title is not None:
+            append(f"&title={_quote(str(title))}")
+        if language is not None:
+            append(f"&lang={_quote(str(language))}")
+        if max_rows is not None:
+            append(f"&maxRows={_quote_number(max_rows)}")
 
-        # Add the optional parameter:
-        self._add_key_value(keys, key='title', value=title)
-        self._add_key_value(keys, key='lang', value=language)
-        self._add_key_value(keys, key='maxRows', value=max_rows)
-
-        return url + urlencode(keys, encoding="utf-8")
+        return "".join(parts)
 
     def wikipedia_bounding_box(self, north, east, south, west, language=None,
                                max_rows=None, secure=None, output_format=None):
@@ -506,22 +704,21 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "wikipediaBoundingBox", output_format)
-
-        # assert the required parameters
-        assert all((north, east, south, west)), "north, east, south and west are required parameters."
+        url = self._create_bare_end_point(secure, "wikipediaBoundingBox", output_format)
 
-        # Add the required parameters
-        self._add_key_value(keys, key='north', value=north)
-        self._add_key_value(keys, key='east', value=east)
-        self._add_key_value(keys, key='south', value=south)
-        self._add_key_value(keys, key='west', value=west)
+        # check the required parameters
+        if north is None or east is None or south is None or west is None:
+            raise ValueError("north, east, south and west are required parameters.")
 
-        # Add the optional parameter:
-        self._add_key_value(keys, key='lang', value=language)
-        self._add_key_value(keys, key='maxRows', value=max_rows)
+        parts = [f"{url}&north={_quote_number(north)}&east={_quote_number(east)}"
+                 f"&south={_quote_number(south)}&west={_quote_number(west)}"]
+        append = parts.append
+        if language is not None:
+            append(f"&lang={_quote(str(language))}")
+        if max_rows is not None:
+            append(f"&maxRows={_quote_number(max_rows)}")
 
-        return url + urlencode(keys, encoding="utf-8")
+        return "".join(parts)
 
     # # Earthquakes: http://www.geonames.org/export/JSON-webservices.html#earthquakesJSON
     def earthquakes_bounding_box(self, north, east, south, west, up_to_date=None, min_magnitude=None, max_rows=None,
@@ -554,24 +751,23 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "earthquakes", output_format)
-
-        # assert the required parameters
-        assert all((north, east, south, west)), "north, east, south and west are required parameters."
+        url = self._create_bare_end_point(secure, "earthquakes", output_format)
 
-        # Add the required parameters
-        self._add_key_value(keys, key='north', value=north)
-        self._add_key_value(keys, key='east', value=east)
-        self._add_key_value(keys, key='south', value=south)
-        self._add_key_value(keys, key='west', value=west)
+        # check the required parameters
+        if north is None or east is None or south is None or west is None:
+            raise ValueError("north, east, south and west are required parameters.")
 
-        # Add the optional parameter:
-        self._add_key_value(keys, key='minMagnitude', value=min_magnitude)
-        self._add_key_value(keys, key='maxRows', value=max_rows)
+        parts = [f"{url}&north={_quote_number(north)}&east={_quote_number(east)}"
+                 f"&south={_quote_number(south)}&west={_quote_number(west)}"]
+        append = parts.append
+        if min_magnitude is not None:
+            append(f"&minMagnitude={_quote_number(min_magnitude)}")
+        if max_rows is not None:
+            append(f"&maxRows={_quote_number(max_rows)}")
+        if up_to_date is not None:
+            append(f"&date={_quote(_date_str(up_to_date))}")
 
-        self._add_date(keys, up_to_date)
-
-        return url + urlencode(keys, encoding="utf-8")
+        return "".join(parts)
 
     # # Weather: http://www.geonames.org/export/JSON-webservices.html#weatherJSON
     def weather_station_bounding_box(self, north, east, south, west, max_rows=None, secure=None, output_format=None):
@@ -599,21 +795,18 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "weather", output_format)
-
-        # assert the required parameters
-        assert all((north, east, south, west)), "north, east, south and west are required parameters."
+        url = self._create_bare_end_point(secure, "weather", output_format)
 
-        # Add the required parameters
-        self._add_key_value(keys, key='north', value=north)
-        self._add_key_value(keys, key='east', value=east)
-        self._add_key_value(keys, key='south', value=south)
-        self._add_key_value(keys, key='west', value=west)
+        # check the required parameters
+        if north is None or east is None or south is None or west is None:
+            raise ValueError("north, east, south and west are required parameters.")
 
-        # Add the optional parameter:
-        self._add_key_value(keys, key='maxRows', value=max_rows)
+        parts = [f"{url}&north={_quote_number(north)}&east={_quote_number(east)}"
+                 f"&south={_quote_number(south)}&west={_quote_number(west)}"]
+        if max_rows is not None:
+            parts.append(f"&maxRows={_quote_number(max_rows)}")
 
-        return url + urlencode(keys, encoding="utf-8")
+        return "".join(parts)
 
     def weather_station_icao(self, icao, secure=None, output_format=None):
         """
@@ -632,15 +825,13 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "weatherIcao", output_format)
-
-        # assert the required parameters
-        assert icao, "icao is a required parameter."
+        url = self._create_bare_end_point(secure, "weatherIcao", output_format)
 
-        # Add the required parameters
-        self._add_key_value(keys, key='ICAO', value=icao)
+        # check the required parameters
+        if not icao:
+            raise ValueError("icao is a required parameter.")
 
-        return url + urlencode(keys, encoding="utf-8")
+        return f"{url}&ICAO={_quote(str(icao))}"
 
     def weather_station_find_nearby(self, latitude, longitude, radius=None, secure=None, output_format=None):
         """
@@ -663,19 +854,17 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "findNearByWeather", output_format)
+        url = self._create_bare_end_point(secure, "findNearByWeather", output_format)
 
-        # assert the required parameters
-        assert latitude or longitude, "latitude and longitude are required parameters."
+        # check the required parameters
+        if latitude is None or longitude is None:
+            raise ValueError("latitude and longitude are required parameters.")
 
-        # Add the required parameters
-        self._add_key_value(keys, key='lat', value=latitude)
-        self._add_key_value(keys, key='lng', value=longitude)
+        parts = [f"{url}&lat={_quote_number(latitude)}&lng={_quote_number(longitude)}"]
+        if radius is not None:
+            parts.append(f"&radius={_quote_number(radius)}")
 
-        # Add the optional parameter:
-        self._add_key_value(keys, key='radius', value=radius)
-
-        return url + urlencode(keys, encoding="utf-8")
+        return "".join(parts)
 
     # # Other webservices
     def country_info(self, country=None, language=None, secure=None, output_format=None):
@@ -698,17 +887,21 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "countryInfo", output_format, additional_output_formats="CSV")
+        url = self._create_bare_end_point(secure, "countryInfo", output_format)
 
-        # Add the optional parameter:
+        parts = [url]
         if country is not None:
-            if isinstance(country, str):
-                country = [country]
-            for c in country:
-                self._add_key_value(keys, key='country', value=c)
-        self._add_key_value(keys, key='lang', value=language)
-
-        return url + urlencode(keys, encoding="utf-8")
+            # Like the list values of search, None elements are left out and the others are written as str
+            country = (country,) if isinstance(country, str) else tuple(str(c) for c in country if c is not None)
+            if country:
+                # Country codes hardly ever need quoting, so all of them are checked at once
+                if _UNSAFE_CHARACTERS.search("".join(country)) is not None:
+                    country = [quote_plus(c) for c in country]
+                parts.append("&country=" + "&country=".join(country))
+        if language is not None:
+            parts.append(f"&lang={_quote(str(language))}")
+
+        return "".join(parts)
 
     def ocean(self, latitude, longitude, radius=None, secure=None, output_format=None):
         """
@@ -732,19 +925,17 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "ocean", output_format)
-
-        # assert the required parameters
-        assert latitude or longitude, "latitude and longitude are required parameters."
+        url = self._create_bare_end_point(secure, "ocean", output_format)
 
-        # Add the required parameters
-        self._add_key_value(keys, key='lat', value=latitude)
-        self._add_key_value(keys, key='lng', value=longitude)
+        # check the required parameters
+        if latitude is None or longitude is None:
+            raise ValueError("latitude and longitude are required parameters.")
 
-        # Add the optional parameter:
-        self._add_key_value(keys, key='radius', value=radius)
+        parts = [f"{url}&lat={_quote_number(latitude)}&lng={_quote_number(longitude)}"]
+        if radius is not None:
+            parts.append(f"&radius={_quote_number(radius)}")
 
-        return url + urlencode(keys, encoding="utf-8")
+        return "".join(parts)
 
     def timezone(self, latitude, longitude, radius=None, language=None, sunrise_sunset_date=None, secure=None,
                  output_format=None):
@@ -772,102 +963,230 @@ class APIUrl(object):
         :rtype: str
         """
 
-        url, keys = self._create_bare_end_point(secure, "timezone", output_format)
+        url = self._create_bare_end_point(secure, "timezone", output_format)
+
+        # check the required parameters
+        if latitude is None or longitude is None:
+            raise ValueError("latitude and longitude are required parameters.")
+
+        parts = [f"{url}&lat={_quote_number(latitude)}&lng={_quote_number(longitude)}"]
+        append = parts.append
+        if radius is not None:
+            append(f"&radius={_quote_number(radius)}")
+        if language is not None:
+            append(f"&lang={_quote(str(language))}")
+        if sunrise_sunset_date is not None:
+            append(f"&date={_quote(_date_str(sunrise_sunset_date))}")
+
+        return "".join(parts)
+
+    def timezone_batch(self, latlngs, radius=None, language=None, sunrise_sunset_date=None, secure=None,
+                       output_format=None):
+        """
+        Construct the timezone urls for a batch of coordinates, see timezone. The endpoint and the optional
+        parameters are shared by all urls and encoded only once.
+
+        :param latlngs: The coordinates of interest
+        :type latlngs: iterable of (latitude, longitude) tuples
+        :param radius: buffer in km for closest timezone in coastal areas
+        :type radius: int
+        :param language: The language for the country name
+        :type language: str
+        :param sunrise_sunset_date: date to give sunrise/sunset times
+        :type sunrise_sunset_date: datetime.date or str "YYYY-MM-DD"
+
+        :param secure: Overwrite the class parameter secure, True for using the secure endpoint
+        :type secure: bool
+        :param output_format: Overwrite the class parameter default_output_format, 'JSON', 'XML',
+        :type output_format: str
+
+        :return: The corresponding urls, in the order of latlngs
+        :rtype: list of str
+        """
 
-        # assert the required parameters
-        assert latitude or longitude, "latitude and longitude are required parameters."
+        url = self._create_bare_end_point(secure, "timezone", output_format)
 
-        # Add the required parameters
-        self._add_key_value(keys, key='lat', value=latitude)
-        self._add_key_value(keys, key='lng', value=longitude)
+        suffix = []
+        if radius is not None:
+            suffix.append(f"&radius={_quote_number(radius)}")
+        if language is not None:
+            suffix.append(f"&lang={_quote(str(language))}")
+        if sunrise_sunset_date is not None:
+            suffix.append(f"&date={_quote(_date_str(sunrise_sunset_date))}")
+        suffix = "".join(suffix)
 
-        # Add the optional parameter:
-        self._add_key_value(keys, key='radius', value=radius)
-        self._add_key_value(keys, key='lang', value=language)
-        self._add_date(keys, sunrise_sunset_date)
+        urls = []
+        append = urls.append
+        for latitude, longitude in latlngs:
+            # check the required parameters
+            if latitude is None or longitude is None:
+                raise ValueError("latitude and longitude are required parameters.")
+            append(f"{url}&lat={_quote_number(latitude)}&lng={_quote_number(longitude)}{suffix}")
 
-        return url + urlencode(keys, encoding="utf-8")
+        return urls
+
+    def build_urls_parallel(self, method, arguments, workers=None):
+        """
+        Construct the urls of a single endpoint for a large batch of arguments, spread over multiple processes.
+        Starting the processes has a fixed cost, so this only pays off for very large batches.
+        :param method: The name of the endpoint method, e.g. 'timezone', see _END_POINT_METHODS
+        :type method: str
+        :param arguments: The arguments for every url, a dict with keyword arguments or a tuple with positional
+         arguments, e.g. [(51.2277, 6.7735), {'latitude': 52.0, 'longitude': 4.1, 'radius': 5}]
+        :type arguments: iterable of dict or tuple
+        :param workers: The number of processes, default is the number of CPUs
+        :type workers: int
+
+        :return: The corresponding urls, in the order of arguments
+        :rtype: list of str
+        """
+
+        # Imported here, loading multiprocessing would slow down importing this module for every other user
+        from concurrent.futures import ProcessPoolExecutor
+        from itertools import repeat
+        import os
+
+        # Fail before starting any process if the endpoint does not exist
+        if method not in _END_POINT_METHODS:
+            raise ValueError(f"{method!r} is not an endpoint method.")
+        if workers is None:
+            workers = os.cpu_count() or 1
+        elif workers < 1:
+            raise ValueError("workers must be at least 1.")
+
+        arguments = list(arguments)
+        chunksize = max(1, len(arguments) // (workers * 4))
+
+        with ProcessPoolExecutor(workers) as executor:
+            return list(executor.map(_build_url, repeat(self), repeat(method), arguments, chunksize=chunksize))
 
     # # Private methods
     @staticmethod
-    def _create_base_url(secure):
+    def _search_keys(q=None, name=None, name_equals=None, name_starts_with=None, max_rows=None, start_row=None,
+                     country=None, country_bias=None, continent_code=None, admin_code1=None, admin_code2=None,
+                     admin_code3=None, feature_class=None, feature_code=None, cities=None, language=None, style=None,
+                     is_name_required=None, tag=None, operator=None, charset=None, fuzzy=None, north=None, east=None,
+                     south=None, west=None, search_language=None, order_by=None, include_bbox=None):
         """
-        Depending if a secure connection is desired the endpoint changes
-        :param secure: True for using the secure endpoint
-        :return: a base endpoint as a string
+        Check the search parameters and pair them with their GeoNames names, shared by search and search_many.
+        See search for the parameters.
+
+        :return: The key-value pairs of the query, without the username and type
+        :rtype: tuple of 2 element-tuples
         """
-        if secure:
-            return "https://secure.geonames.org/"
-        # Do not use the secure endpoint
-        return "http://api.geonames.org/"
 
-    def _create_bare_end_point(self, secure, end_point, output_format=None, additional_output_formats=None):
+        # Check if the required parameters are given
+        if q is None and name is None and name_equals is None:
+            raise ValueError("q, name or name_equals required")
+
+        # The bounding box is only used if it is complete, an incomplete one is left out by _freeze_keys
+        if north is None or east is None or south is None or west is None:
+            north = east = south = west = None
+
+        return (
+            ('q', q),
+            ('name', name),
+            ('name_equals', name_equals),
+            ('name_startsWith', name_starts_with),
+            ('maxRows', max_rows),
+            ('startRow', start_row),
+            ('country', country),
+            ('countryBias', country_bias),
+            ('continentCode', continent_code),
+            ('adminCode1', admin_code1),
+            ('adminCode2', admin_code2),
+            ('adminCode3', admin_code3),
+            ('featureClass', feature_class),
+            ('featureCode', feature_code),
+            ('cities', cities),
+            ('lang', language),
+            ('style', style),
+            ('isNameRequired', is_name_required),
+            ('tag', tag),
+            ('operator', operator),
+            ('charset', charset),
+            ('fuzzy', fuzzy),
+            ('north', north),
+            ('east', east),
+            ('south', south),
+            ('west', west),
+            ('searchlang', search_language),
+            ('orderby', order_by),
+            ('inclBbox', include_bbox),
+        )
+
+    def _create_bare_end_point(self, secure, end_point, output_format=None):
         """
-        Create a base endpoint that is needed for most methods
-        
+        Create the endpoint url including the username, that is needed for most methods. The urls for the
+        endpoints in _END_POINTS are precomputed in __init__, other combinations are built by _build_end_point.
+
         :param secure: Overwrite the class parameter secure, True for using the secure endpoint
         :type secure: bool
         :param output_format: Overwrite the class parameter default_output_format, 'JSON', 'XML',
         :type output_format: str
-        :param additional_output_formats: Additional output format to add for this endpoint,
-        :type additional_output_formats: str or list
-        
-        :return: url, keys
-        :rtype: str, list of 2 element-tuples
+
+        :return: url
+        :rtype: str
         """
-        if secure:
-            base_url = self._create_base_url(secure)
-        else:
-            base_url = self._base_url
+        url = self._end_points.get(
+            (end_point, self._secure if secure is None else secure, output_format or self.default_output_format))
+        if url is None:
+            url = self._build_end_point(secure, end_point, output_format)
 
-        # Add the search endpoint:
-        url = base_url + end_point
-        if output_format:
-            if output_format.upper() == "JSON":
-                url += "JSON"
-            if additional_output_formats is not None:
-                if isinstance(additional_output_formats, str):
-                    additional_output_formats = [additional_output_formats]
-                additional_output_formats = [f.upper() for f in additional_output_formats]
-            if output_format.upper() == "CSV" and output_format.upper() in additional_output_formats:
-                url += "CSV"
-        else:
-            if self.default_output_format == "JSON":
-                url += "JSON"
-        url += "?"
+        return url
 
-        keys = [("username", self.username)]
+    def _build_end_point(self, secure, end_point, output_format=None):
+        """
+        Build the endpoint url including the username, see _create_bare_end_point. The JSON output format and the
+        additional output formats of the endpoint (see _END_POINTS) are added to the endpoint name, any other format
+        results in the bare endpoint (XML).
 
-        return url, keys
+        :param secure: Overwrite the class parameter secure, True for using the secure endpoint
+        :type secure: bool
+        :param output_format: Overwrite the class parameter default_output_format, 'JSON', 'XML',
+        :type output_format: str
 
-    @staticmethod
-    def _add_key_value(keys, key, value):
-        """
-        This function adds a key-value pair to the keys list, if the value is None it will not be added.
-        :param keys: The key-value pairs that will be used to construct the API url
-        :type keys: list
-        :param key: The key to add
-        :type key: str
-        :param value: The value belonging to the key
+        :return: url
+        :rtype: str
         """
-        if value is not None:
-            keys.append((key, str(value)))
+        base_url = self._base_urls[self._secure if secure is None else secure]
+        output_format = (output_format or self.default_output_format).upper()
+
+        # Add the endpoint:
+        url = base_url + end_point
+        if output_format == "JSON":
+            url += "JSON"
+        elif output_format in self._END_POINTS[end_point]:
+            url += output_format
+
+        return url + "?username=" + self._username_encoded
 
-    def _add_date(self, keys, date_to_add, key='date'):
+    def _finalize(self, url, keys):
         """
-        This function adds a key-value date pair to the keys list, if the date_to_add is None it will not be added.
+        Encode the key-value pairs into the query string of the url, pairs with a None value are left out.
+        List values are expanded into a repeated key (e.g. country=NL&country=DE). Identical queries are served
+        from a cache.
+        :param url: The endpoint url including the username, see _create_bare_end_point
+        :type url: str
         :param keys: The key-value pairs that will be used to construct the API url
-        :type keys: list
-        :param date_to_add: The value belonging to the key
-        :type date_to_add: datetime.date or str "YYYY-MM-DD"
-        :param key: The key to add, defaults='date'
-        :type key: str
+        :type keys: tuple or list of 2 element-tuples
+
+        :return: The corresponding url
+        :rtype: str
         """
+        # The username is already part of the url, only the remaining pairs are encoded
+        keys = _freeze_keys(keys)
+        if not keys:
+            return url
 
-        if isinstance(date_to_add, date):
-            date_to_add = date_to_add.strftime("%Y-%m-%d")
+        return f"{url}&{_encode_query(keys)}"
 
-        self._add_key_value(keys, key, date_to_add)
+    @staticmethod
+    def cache_clear():
+        """
+        Clear the cache of encoded query strings, which is shared by all APIUrl instances.
+        """
+        _encode_query.cache_clear()
 
 
 if __name__ == "__main__":